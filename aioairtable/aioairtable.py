@@ -1,29 +1,36 @@
+import asyncio
 import logging
+import random
+from collections import OrderedDict, deque
 from datetime import datetime
-from enum import IntEnum, StrEnum, unique
+from enum import StrEnum, unique
 from types import TracebackType
 from typing import (
     Any,
     AsyncIterator,
     Final,
-    Generator,
     Generic,
     Iterable,
     Literal,
     Self,
+    Sequence,
     Type,
     TypeVar,
+    cast,
 )
 
-import backoff
 import msgspec.json
-from aiofreqlimit import FreqLimit
-from aiohttp import BaseConnector, ClientResponseError, ClientSession
+from aiohttp import (
+    BaseConnector,
+    ClientResponseError,
+    ClientSession,
+    TCPConnector,
+)
 from msgspec import Struct, field
 from multidict import CIMultiDict, MultiDict
 from yarl import URL
 
-from .helpers import get_software
+from .helpers import chunked, get_software
 
 __all__ = (
     "Airtable",
@@ -43,16 +50,19 @@ __all__ = (
 SOFTWARE: Final = get_software()
 API_URL: Final = URL("https://api.airtable.com/v0")
 AT_INTERVAL: Final = 1 / 5
+AT_BURST: Final = 5
+AT_RECORDS_PER_REQUEST: Final = 10
 AT_WAIT: Final = 30.0
+AT_MAX_RETRIES: Final = 8
+AT_LIMIT_PER_HOST: Final = 10
+AT_KEEPALIVE_TIMEOUT: Final = 75.0
+AT_DNS_CACHE_TTL: Final = 300
 
 
-@unique
-class BackoffCodes(IntEnum):
-    TOO_MANY_REQUESTS = 429
-    BAD_GATEWAY = 502
-    SERVICE_UNAVAILABLE = 503
-    GATEWAY_TIMEOUT = 504
-
+_RETRY_CODES: Final[frozenset[int]] = frozenset({429, 502, 503, 504})
+_BACKOFFS: Final = tuple(
+    float(2**attempt) for attempt in range(AT_MAX_RETRIES)
+)
 
 Method = Literal["GET", "POST", "PATCH", "DELETE"]
 
@@ -76,6 +86,10 @@ class RecordRequest(Struct, Generic[_T], frozen=True):
     fields: _T
 
 
+class RecordsRequest(Struct, Generic[_T], frozen=True):
+    records: tuple[RecordRequest[_T], ...]
+
+
 class DeletedRecord(Struct, frozen=True):
     id: str
     deleted: bool
@@ -127,57 +141,109 @@ class CellFormat(StrEnum):
     STRING = "string"
 
 
-def backoff_wait_gen(at_wait: float) -> Generator[float, Any, None]:
-    expo_gen = backoff.expo()
-    yield expo_gen.send(None)
-    for value in expo_gen:
-        yield at_wait + value
+class SlidingWindow:
+    __slots__ = ("_limit", "_period", "_times")
+
+    def __init__(self, limit: int, period: float) -> None:
+        self._limit: Final = limit
+        self._period: Final = period
+        self._times: Final = deque[float](maxlen=limit)
+
+    async def acquire(self) -> None:
+        now = asyncio.get_running_loop().time()
+        times = self._times
+        if len(times) < self._limit:
+            at = now
+        else:
+            at = max(now, times[0] + self._period)
+        times.append(at)
+        if at > now:
+            await asyncio.sleep(at - now)
+
+
+def optional_params(
+    *params: tuple[str, int | str | None]
+) -> list[tuple[str, int | str]]:
+    return [(key, value) for key, value in params if value is not None]
+
 
+def sort_keys(index: int) -> tuple[str, str]:
+    return f"sort[{index}][field]", f"sort[{index}][direction]"
 
-def backoff_giveup(exception: Exception) -> bool:
-    assert isinstance(exception, ClientResponseError)
-    try:
-        BackoffCodes(exception.status)
-    except ValueError:
-        return True
-    else:
-        return False
+
+_SORT_KEYS: Final = tuple(sort_keys(index) for index in range(16))
 
 
 def build_repr(class_name: str, **kwargs: Any) -> str:
-    args = ", ".join(f"{key}={value!r}" for key, value in kwargs.items())
+    args = ", ".join([f"{key}={value!r}" for key, value in kwargs.items()])
     return f"{class_name}({args})"
 
 
 _R = TypeVar("_R", bound=Struct)
 
+_ENCODER: Final = msgspec.json.Encoder()
+_DECODERS: Final[dict[Any, "msgspec.json.Decoder[Any]"]] = {}
+
+
+def get_decoder(type_: Type[_R]) -> "msgspec.json.Decoder[_R]":
+    decoder = _DECODERS.get(type_)
+    if decoder is None:
+        decoder = _DECODERS[type_] = msgspec.json.Decoder(type_)
+    return decoder
+
 
 class Airtable:
+    __slots__ = (
+        "_headers",
+        "_json_headers",
+        "_owns_client",
+        "_client",
+        "_windows",
+        "_repr",
+        "_etag_cache_size",
+        "_etag_cache",
+    )
+
     def __init__(
         self,
         api_key: str,
         connector: BaseConnector | None = None,
+        *,
+        session: ClientSession | None = None,
+        etag_cache_size: int = 0,
     ) -> None:
+        if session is not None and connector is not None:
+            raise ValueError("Pass either session or connector, not both")
         self._headers: Final = CIMultiDict(
             {
                 "User-Agent": SOFTWARE,
                 "Authorization": f"Bearer {api_key}",
             }
         )
-        self._json_headers: Final = CIMultiDict(
-            {
-                **self._headers,
-                **{"Content-Type": "application/json"},
-            }
-        )
-        self._client = ClientSession(
-            connector=connector,
-            raise_for_status=True,
-        )
-        self._freq_limit = FreqLimit(AT_INTERVAL)
+        self._json_headers: Final = self._headers.copy()
+        self._json_headers["Content-Type"] = "application/json"
+        self._owns_client: Final = session is None
+        if session is None:
+            if connector is None:
+                connector = TCPConnector(
+                    limit_per_host=AT_LIMIT_PER_HOST,
+                    keepalive_timeout=AT_KEEPALIVE_TIMEOUT,
+                    ttl_dns_cache=AT_DNS_CACHE_TTL,
+                )
+            session = ClientSession(
+                connector=connector,
+                raise_for_status=True,
+            )
+        self._client: Final = session
+        self._windows: Final[dict[str, SlidingWindow]] = {}
+        self._repr: Final = build_repr("Airtable", api_key="...")
+        self._etag_cache_size: Final = etag_cache_size
+        self._etag_cache: Final = OrderedDict[
+            tuple[URL, Type[Struct]], tuple[str, Struct]
+        ]()
 
     def __repr__(self) -> str:
-        return build_repr("Airtable", api_key="...")
+        return self._repr
 
     @property
     def client(self) -> ClientSession:
@@ -190,32 +256,55 @@ class Airtable:
         type_: Type[_R],
         payload: Struct | None = None,
     ) -> _R:
+        headers = self._headers if payload is None else self._json_headers
+        use_cache = method == "GET" and self._etag_cache_size > 0
+        cached = self._etag_cache.get((url, type_)) if use_cache else None
+        if cached is not None:
+            headers = headers.copy()
+            headers["If-None-Match"] = cached[0]
         async with self._client.request(
             method,
             url,
-            headers=self._headers if payload is None else self._json_headers,
-            data=msgspec.json.encode(payload) if payload is not None else None,
+            headers=headers,
+            data=_ENCODER.encode(payload) if payload is not None else None,
+            raise_for_status=True,
         ) as client_response:
-            logger.debug(
-                "Request %s %s %r",
-                method,
-                url.human_repr(),
-                payload,
-            )
+            debug = logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                logger.debug(
+                    "Request %s %s %r",
+                    method,
+                    url.human_repr(),
+                    payload,
+                )
+            if cached is not None and client_response.status == 304:
+                self._etag_cache.move_to_end((url, type_))
+                logger.debug("Response not modified")
+                return cast(_R, cached[1])
             response_data = await client_response.read()
-            response = msgspec.json.decode(response_data, type=type_)
-            logger.debug(
-                "Response %r",
-                response,
-            )
+            response = get_decoder(type_).decode(response_data)
+            if debug:
+                logger.debug(
+                    "Response %r",
+                    response,
+                )
+            if use_cache and "ETag" in client_response.headers:
+                etag = client_response.headers["ETag"]
+                self._cache_response(url, type_, etag, response)
             return response
 
-    @backoff.on_exception(
-        backoff_wait_gen,
-        ClientResponseError,
-        giveup=backoff_giveup,
-        at_wait=AT_WAIT,
-    )
+    def _cache_response(
+        self,
+        url: URL,
+        type_: Type[Struct],
+        etag: str,
+        response: Struct,
+    ) -> None:
+        self._etag_cache[url, type_] = (etag, response)
+        self._etag_cache.move_to_end((url, type_))
+        if len(self._etag_cache) > self._etag_cache_size:
+            self._etag_cache.popitem(last=False)
+
     async def request(
         self,
         base_id: str,
@@ -224,17 +313,37 @@ class Airtable:
         type_: Type[_R],
         payload: Struct | None = None,
     ) -> _R:
-        async with self._freq_limit.resource(base_id):
-            return await self._request(
-                method,
-                url,
-                type_,
-                payload,
+        window = self._windows.get(base_id)
+        if window is None:
+            window = self._windows[base_id] = SlidingWindow(
+                AT_BURST, AT_BURST * AT_INTERVAL
             )
+        attempt = 0
+        while True:
+            await window.acquire()
+            try:
+                return await self._request(
+                    method,
+                    url,
+                    type_,
+                    payload,
+                )
+            except ClientResponseError as exception:
+                if (
+                    exception.status not in _RETRY_CODES
+                    or attempt == AT_MAX_RETRIES
+                ):
+                    raise
+            await asyncio.sleep(
+                AT_WAIT + random.uniform(0, _BACKOFFS[attempt])
+            )
+            attempt += 1
 
     async def close(self) -> None:
-        await self._client.close()
-        await self._freq_limit.clear()
+        if self._owns_client:
+            await self._client.close()
+        self._windows.clear()
+        self._etag_cache.clear()
 
     def base(self, base_id: str) -> "AirtableBase":
         return AirtableBase(base_id, self)
@@ -252,6 +361,8 @@ class Airtable:
 
 
 class AirtableBase:
+    __slots__ = ("_airtable", "_id", "_url", "_repr")
+
     def __init__(
         self,
         base_id: str,
@@ -260,14 +371,15 @@ class AirtableBase:
         self._airtable: Final[Airtable] = airtable
         self._id: Final[str] = base_id
         self._url: Final[URL] = API_URL / base_id
-
-    def __repr__(self) -> str:
-        return build_repr(
+        self._repr: Final = build_repr(
             "AirtableBase",
-            base_id=self._id,
-            airtable=self._airtable,
+            base_id=base_id,
+            airtable=airtable,
         )
 
+    def __repr__(self) -> str:
+        return self._repr
+
     @property
     def id(self) -> str:
         return self._id
@@ -281,7 +393,7 @@ class AirtableBase:
         method: Method,
         url: URL,
         type_: Type[_R],
-        payload: Any = None,
+        payload: Struct | None = None,
     ) -> _R:
         return await self._airtable.request(
             self._id,
@@ -297,7 +409,20 @@ class AirtableBase:
         return AirtableTable(table_name, self, fields_type)
 
 
+Page = tuple[tuple["AirtableRecord[_T]", ...], str | None]
+
+
 class AirtableTable(Generic[_T]):
+    __slots__ = (
+        "_name",
+        "_base",
+        "_url",
+        "_fields_type",
+        "_record_type",
+        "_record_list_type",
+        "_repr",
+    )
+
     def __init__(
         self,
         table_name: str,
@@ -308,11 +433,18 @@ class AirtableTable(Generic[_T]):
         self._base: Final = base
         self._url: Final[URL] = base.url / table_name
         self._fields_type: Final = fields_type
+        self._record_type: Final[Type[Record[_T]]] = Record[
+            fields_type  # type: ignore[valid-type]
+        ]
+        self._record_list_type: Final[Type[RecordList[_T]]] = RecordList[
+            fields_type  # type: ignore[valid-type]
+        ]
+        self._repr: Final = build_repr(
+            "AirtableTable", table_name=table_name, base=base
+        )
 
     def __repr__(self) -> str:
-        return build_repr(
-            "AirtableTable", table_name=self._name, base=self._base
-        )
+        return self._repr
 
     @property
     def name(self) -> str:
@@ -335,7 +467,7 @@ class AirtableTable(Generic[_T]):
         method: Method,
         url: URL,
         type_: Type[_R],
-        payload: Any = None,
+        payload: Struct | None = None,
     ) -> _R:
         return await self._base.request(
             method,
@@ -344,7 +476,7 @@ class AirtableTable(Generic[_T]):
             payload,
         )
 
-    async def list_records(
+    def _list_url(
         self,
         *,
         fields: Iterable[str] | None = None,
@@ -357,48 +489,94 @@ class AirtableTable(Generic[_T]):
         time_zone: str | None = None,
         user_locale: str | None = None,
         offset: str | None = None,
-    ) -> tuple[tuple["AirtableRecord[_T]", ...], str | None]:
+    ) -> URL:
+        if (
+            fields is None
+            and filter_by_formula is None
+            and max_records is None
+            and page_size is None
+            and sort is None
+            and view is None
+            and cell_format is None
+            and time_zone is None
+            and user_locale is None
+            and offset is None
+        ):
+            return self._url
         params = MultiDict[int | str]()
         if fields is not None:
-            params.extend(("fields[]", fields) for fields in fields)
-        if filter_by_formula is not None:
-            params.add("filterByFormula", filter_by_formula)
-        if max_records is not None:
-            params.add("maxRecords", max_records)
-        if page_size is not None:
-            params.add("pageSize", page_size)
+            params.extend(("fields[]", field_name) for field_name in fields)
+        params.extend(
+            optional_params(
+                ("filterByFormula", filter_by_formula),
+                ("maxRecords", max_records),
+                ("pageSize", page_size),
+            )
+        )
         if sort is not None:
             for index, (field_name, direction) in enumerate(sort):
-                params.add(f"sort[{index}][field]", field_name)
-                params.add(f"sort[{index}][direction]", direction)
-        if view is not None:
-            params.add("view", view)
-        if cell_format is not None:
-            params.add("cellFormat", cell_format)
-        if time_zone is not None:
-            params.add("timeZone", time_zone)
-        if user_locale is not None:
-            params.add("userLocale", user_locale)
-        if offset is not None:
-            params.add("offset", offset)
-        url = self._url.with_query(params)
-        fields_type = self._fields_type
+                if index < len(_SORT_KEYS):
+                    field_key, direction_key = _SORT_KEYS[index]
+                else:
+                    field_key, direction_key = sort_keys(index)
+                params.add(field_key, field_name)
+                params.add(direction_key, direction)
+        params.extend(
+            optional_params(
+                ("view", view),
+                ("cellFormat", cell_format),
+                ("timeZone", time_zone),
+                ("userLocale", user_locale),
+                ("offset", offset),
+            )
+        )
+        return self._url.with_query(params)
+
+    async def _list_page(self, url: URL) -> "Page[_T]":
         record_list = await self._request(
-            "GET",
-            url,
-            type_=RecordList[fields_type],  # type: ignore[valid-type]
+            "GET", url, type_=self._record_list_type
         )
         records = tuple(
-            AirtableRecord(
-                record.id,
-                record.fields,
-                record.created_time,
-                self,
-            )
-            for record in record_list.records
+            [
+                AirtableRecord(
+                    record.id,
+                    record.fields,
+                    record.created_time,
+                    self,
+                )
+                for record in record_list.records
+            ]
         )
         return records, record_list.offset
 
+    async def list_records(
+        self,
+        *,
+        fields: Iterable[str] | None = None,
+        filter_by_formula: str | None = None,
+        max_records: int | None = None,
+        page_size: int | None = None,
+        sort: Iterable[tuple[str, SortDirection]] | None = None,
+        view: str | None = None,
+        cell_format: CellFormat | None = None,
+        time_zone: str | None = None,
+        user_locale: str | None = None,
+        offset: str | None = None,
+    ) -> "Page[_T]":
+        url = self._list_url(
+            fields=fields,
+            filter_by_formula=filter_by_formula,
+            max_records=max_records,
+            page_size=page_size,
+            sort=sort,
+            view=view,
+            cell_format=cell_format,
+            time_zone=time_zone,
+            user_locale=user_locale,
+            offset=offset,
+        )
+        return await self._list_page(url)
+
     async def iter_records(
         self,
         *,
@@ -412,34 +590,48 @@ class AirtableTable(Generic[_T]):
         time_zone: str | None = None,
         user_locale: str | None = None,
     ) -> AsyncIterator["AirtableRecord[_T]"]:
-        offset: str | None = None
-        while True:
-            records, offset = await self.list_records(
-                fields=fields,
-                filter_by_formula=filter_by_formula,
-                max_records=max_records,
-                page_size=page_size,
-                sort=sort,
-                view=view,
-                cell_format=cell_format,
-                time_zone=time_zone,
-                user_locale=user_locale,
-                offset=offset,
-            )
-            for record in records:
-                yield record
-            if offset is None:
-                break
+        url = self._list_url(
+            fields=fields,
+            filter_by_formula=filter_by_formula,
+            max_records=max_records,
+            page_size=page_size,
+            sort=sort,
+            view=view,
+            cell_format=cell_format,
+            time_zone=time_zone,
+            user_locale=user_locale,
+        )
+        list_page = self._list_page
+        remaining = max_records
+        next_page: asyncio.Task[Page[_T]] | None = None
+        try:
+            records, offset = await list_page(url)
+            while True:
+                if remaining is not None:
+                    remaining -= len(records)
+                if offset is not None and (remaining is None or remaining > 0):
+                    next_page = asyncio.create_task(
+                        list_page(url.update_query(offset=offset))
+                    )
+                for record in records:
+                    yield record
+                if next_page is None:
+                    break
+                records, offset = await next_page
+                next_page = None
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+                await asyncio.gather(next_page, return_exceptions=True)
 
     async def retrieve_record(
         self,
         record_id: str,
     ) -> "AirtableRecord[_T]":
-        fields_type = self._fields_type
         record = await self._request(
             "GET",
             self._url / record_id,
-            type_=Record[fields_type],  # type: ignore[valid-type]
+            type_=self._record_type,
         )
         return AirtableRecord(
             record.id,
@@ -452,11 +644,10 @@ class AirtableTable(Generic[_T]):
         self,
         fields: _T,
     ) -> "AirtableRecord[_T]":
-        fields_type = self._fields_type
         record = await self._request(
             "POST",
             self._url,
-            type_=Record[fields_type],  # type: ignore[valid-type]
+            type_=self._record_type,
             payload=RecordRequest(fields),
         )
         return AirtableRecord(
@@ -466,8 +657,42 @@ class AirtableTable(Generic[_T]):
             table=self,
         )
 
+    async def create_records(
+        self,
+        fields: Sequence[_T],
+    ) -> tuple["AirtableRecord[_T]", ...]:
+        records: list[AirtableRecord[_T]] = []
+        for chunk in chunked(fields, AT_RECORDS_PER_REQUEST):
+            record_list = await self._request(
+                "POST",
+                self._url,
+                type_=self._record_list_type,
+                payload=RecordsRequest(
+                    tuple(RecordRequest(item) for item in chunk)
+                ),
+            )
+            records.extend(
+                AirtableRecord(
+                    record.id,
+                    record.fields,
+                    record.created_time,
+                    table=self,
+                )
+                for record in record_list.records
+            )
+        return tuple(records)
+
 
 class AirtableRecord(Generic[_T]):
+    __slots__ = (
+        "_table",
+        "_id",
+        "_url",
+        "_fields",
+        "_created_time",
+        "_deleted",
+    )
+
     def __init__(
         self,
         record_id: str,
@@ -477,7 +702,7 @@ class AirtableRecord(Generic[_T]):
     ) -> None:
         self._table: Final = table
         self._id: Final = record_id
-        self._url: Final = table.url / record_id
+        self._url: URL | None = None
         self._fields = fields
         self._created_time: Final = created_time
         self._deleted: bool = False
@@ -497,6 +722,8 @@ class AirtableRecord(Generic[_T]):
 
     @property
     def url(self) -> URL:
+        if self._url is None:
+            self._url = self._table.url / self._id
         return self._url
 
     @property
@@ -535,12 +762,11 @@ class AirtableRecord(Generic[_T]):
     ) -> None:
         if self._deleted:
             raise RuntimeError("Record is deleted")
-        fields_type = self._table.fields_type
         record = await self._request(
             "PATCH",
-            self._url,
+            self.url,
             payload=RecordRequest(fields),
-            type_=Record[fields_type],  # type: ignore[valid-type]
+            type_=self._table._record_type,
         )
         self._fields = record.fields
 
@@ -549,7 +775,7 @@ class AirtableRecord(Generic[_T]):
             raise RuntimeError("Record is already deleted")
         record = await self._request(
             "DELETE",
-            self._url,
+            self.url,
             type_=DeletedRecord,
         )
         assert record.deleted
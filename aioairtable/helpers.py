@@ -1,13 +1,28 @@
-__all__ = ("get_python_version", "get_software")
+from functools import cache
+from sys import version_info
+from typing import Final, Iterator, Sequence, TypeVar
 
+__all__ = ("chunked", "get_python_version", "get_software")
+
+_T = TypeVar("_T")
+
+PYTHON_VERSION: Final = (
+    f"{version_info.major}.{version_info.minor}.{version_info.micro}"
+)
 
-def get_python_version() -> str:
-    from sys import version_info as version
 
-    return f"{version.major}.{version.minor}.{version.micro}"
+def get_python_version() -> str:
+    return PYTHON_VERSION
 
 
+@cache
 def get_software() -> str:
     from . import __version__
 
-    return f"Python/{get_python_version()} aioairtable/{__version__}"
+    return f"Python/{PYTHON_VERSION} aioairtable/{__version__}"
+
+
+def chunked(items: Sequence[_T], size: int) -> Iterator[Sequence[_T]]:
+    for start in range(0, len(items), size):
+        stop = start + size
+        yield items[start:stop]
@@ -43,10 +43,11 @@ setup(
         "aiohttp",
         "multidict",
         "yarl",
-        "backoff>=2",
-        "aiofreqlimit>=0.0.7",
         "msgspec",
     ],
+    extras_require={
+        "speedups": ["aiohttp[speedups]"],
+    },
     tests_require=[
         "pytest",
         "pytest-asyncio",
@@ -0,0 +1,15 @@
+from asyncio import AbstractEventLoop
+from typing import Callable, Mapping
+
+from pytest import Config, Item
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover
+    pass
+else:
+
+    def pytest_asyncio_loop_factories(
+        config: Config, item: Item
+    ) -> Mapping[str, Callable[[], AbstractEventLoop]]:
+        return {"uvloop": uvloop.new_event_loop}
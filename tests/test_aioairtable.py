@@ -1,8 +1,11 @@
 import asyncio
 import os
 import re
+from collections import Counter
+from copy import deepcopy
 from dataclasses import dataclass
-from datetime import UTC, datetime, timezone
+from datetime import UTC, datetime
+from itertools import count, islice
 from tempfile import mkdtemp
 from typing import (
     Any,
@@ -10,6 +13,7 @@ from typing import (
     Awaitable,
     Callable,
     Final,
+    Hashable,
     Mapping,
     Optional,
     Protocol,
@@ -17,14 +21,16 @@ from typing import (
     cast,
     runtime_checkable,
 )
+from unittest.mock import call
 
-import backoff
+import msgspec.json
 import pytest
 import pytest_asyncio
 from aiohttp import (
     ClientResponseError,
     ClientSession,
     RequestInfo,
+    TCPConnector,
     UnixConnector,
 )
 from aiohttp.web import (
@@ -33,12 +39,12 @@ from aiohttp.web import (
     HTTPBadRequest,
     HTTPNotFound,
     Request,
+    RequestKey,
     Response,
     StreamResponse,
     UnixSite,
     delete,
     get,
-    json_response,
     middleware,
     patch,
     post,
@@ -47,6 +53,7 @@ from hypothesis import given
 from hypothesis.strategies import integers
 from msgspec import Struct
 from multidict import CIMultiDict, CIMultiDictProxy
+from pytest_mock import MockerFixture
 from yarl import URL
 
 from aioairtable import aioairtable as aat
@@ -61,10 +68,14 @@ from aioairtable.aioairtable import (
 )
 
 DT_FORMAT: Final = "%Y-%m-%dT%H:%M:%S.000Z"
+DT_STR: Final = datetime.now().strftime(DT_FORMAT)
+SORT_KEY_RE: Final = re.compile(r"sort\[([^]]+)]\[([^]]+)]")
+# uvloop's clock has millisecond resolution
+CLOCK_RESOLUTION: Final = 0.001
 
 
 def parse_dt(string: str) -> datetime:
-    return datetime.strptime(string, DT_FORMAT).replace(tzinfo=timezone.utc)
+    return datetime.fromisoformat(string)
 
 
 FieldsMapping = Mapping[str, Any]
@@ -81,6 +92,47 @@ class DeletedRecord(TypedDict):
     deleted: bool
 
 
+BASELINE_RECORDS: Final = tuple(
+    Record(
+        id=f"record{index:03d}",
+        fields={
+            "field_1": f"value_1_{index:03d}",
+            "field_2": f"value_2_{index:03d}",
+            "field_3": f"value_3_{index:03d}",
+        },
+        createdTime=DT_STR,
+    )
+    for index in range(200)
+)
+
+TABLE_URL: Final = aat.API_URL / "base_id" / "table_name"
+LIST_RECORDS_URL: Final = TABLE_URL.with_query(
+    (
+        ("fields[]", "field_1"),
+        ("fields[]", "field_2"),
+        ("filterByFormula", "{field_3}"),
+        ("maxRecords", "100500"),
+        ("pageSize", "3"),
+        ("sort[0][field]", "field_1"),
+        ("sort[0][direction]", "asc"),
+        ("sort[1][field]", "field_2"),
+        ("sort[1][direction]", "desc"),
+        ("view", "table3"),
+        ("cellFormat", "json"),
+        ("timeZone", "Europe/Moscow"),
+        ("userLocale", "ru"),
+        ("offset", "record033"),
+    )
+)
+ITER_RECORDS_URL: Final = TABLE_URL.with_query(
+    (
+        ("fields[]", "field_1"),
+        ("maxRecords", "6"),
+        ("pageSize", "3"),
+    )
+)
+
+
 @dataclass(frozen=True)
 class RequestData:
     method: str
@@ -89,6 +141,7 @@ class RequestData:
 
 
 Handler = Callable[[Request], Awaitable[StreamResponse]]
+REQUEST_DATA: Final = RequestKey[Any]("request_data")
 
 
 @runtime_checkable
@@ -96,31 +149,57 @@ class SupportsLessThan(Protocol):
     def __lt__(self, other: Any) -> bool: ...
 
 
-def fields_sort_key(field: str) -> Callable[[Record], SupportsLessThan]:
-    def _fields_sort_key(record: Record) -> SupportsLessThan:
-        if not isinstance(record["fields"][field], SupportsLessThan):
+def fields_sort_key(
+    records: list[Record], sort_fields: list[tuple[str, bool]]
+) -> Callable[[Record], tuple[SupportsLessThan, ...]]:
+    ranks: dict[str, dict[Hashable, int]] = {}
+    for field, descending in sort_fields:
+        values = [record["fields"][field] for record in records]
+        if not all(
+            isinstance(value, SupportsLessThan)
+            and (not descending or isinstance(value, Hashable))
+            for value in values
+        ):
             raise HTTPBadRequest(reason=f'"{field}" type not sortable')
-        return cast(SupportsLessThan, record["fields"][field])
+        if descending:
+            ranks[field] = {
+                value: -index
+                for index, value in enumerate(sorted(set(values)))
+            }
+
+    def _fields_sort_key(record: Record) -> tuple[SupportsLessThan, ...]:
+        fields = record["fields"]
+        return tuple(
+            (
+                ranks[field][fields[field]]
+                if field in ranks
+                else cast(SupportsLessThan, fields[field])
+            )
+            for field, _ in sort_fields
+        )
 
     return _fields_sort_key
 
 
+def json_response(data: Any) -> Response:
+    return Response(
+        body=msgspec.json.encode(data), content_type="application/json"
+    )
+
+
 class AirtableServer:
     def __init__(self, api_key: str) -> None:
         self._started: bool = False
         self._tmp_dir: str | None = None
         self._connector: UnixConnector | None = None
         self._loop = asyncio.get_running_loop()
-        self._tables: dict[tuple[str, str], list[Record]] = {}
+        self._tables: dict[tuple[str, str], dict[str, Record]] = {}
+        self._saved_tables: dict[tuple[str, str], dict[str, Record]] = {}
+        self._dirty = False
         self._requests: list[RequestData] = []
-        self._api_key: Final = api_key
-        application = Application(
-            middlewares=(
-                self._auth,
-                self._content_type,
-                self._log,
-            )
-        )
+        self._new_ids: Final = count()
+        self._authorization: Final = f"Bearer {api_key}"
+        application = Application(middlewares=(self._handle,))
         application.router.add_routes(
             (
                 get(
@@ -148,42 +227,30 @@ class AirtableServer:
         self._runner = AppRunner(application)
 
     @middleware
-    async def _auth(
+    async def _handle(
         self,
         request: Request,
         handler: Handler,
     ) -> StreamResponse:
-        if "Authorization" not in request.headers:
+        headers = request.headers
+        authorization = headers.get("Authorization")
+        if authorization is None:
             raise HTTPBadRequest(reason="Authorization header absent")
-        if request.headers["Authorization"] != f"Bearer {self._api_key}":
+        if authorization != self._authorization:
             raise HTTPBadRequest(reason="Wrong authorization header")
-        if request.headers.get("User-Agent") != aat.SOFTWARE:
+        if headers.get("User-Agent") != aat.SOFTWARE:
             raise HTTPBadRequest(reason="Wrong user-agent header")
-        return await handler(request)
-
-    @middleware
-    async def _content_type(
-        self,
-        request: Request,
-        handler: Handler,
-    ) -> StreamResponse:
-        length = len(await request.read())
-        if length > 0:
-            if "Content-Type" not in request.headers:
+        body = await request.read()
+        if body:
+            if "Content-Type" not in headers:
                 raise HTTPBadRequest(reason="Content-Type header absent")
-            if request.headers["Content-Type"] != "application/json":
+            if headers["Content-Type"] != "application/json":
                 raise HTTPBadRequest(reason="Wrong Content-Type header")
-        return await handler(request)
-
-    @middleware
-    async def _log(
-        self,
-        request: Request,
-        handler: Handler,
-    ) -> StreamResponse:
         url = request.url.with_scheme("https")
         has_data = request.method in ("POST", "PATCH")
-        data = await request.json() if has_data else None
+        data = request[REQUEST_DATA] = (
+            msgspec.json.decode(body) if has_data else None
+        )
         self._requests.append(RequestData(request.method, url, data))
         return await handler(request)
 
@@ -196,19 +263,27 @@ class AirtableServer:
         table_name: str,
         records: list[Record],
     ) -> None:
-        if (base_id, table_name) in self._tables:
-            fields_keys = self._tables[base_id, table_name][0]["fields"].keys()
+        table = self._tables.setdefault((base_id, table_name), {})
+        if __debug__ and table:
+            fields_keys = frozenset(next(iter(table.values()))["fields"])
             assert all(
-                record["fields"].keys() == fields_keys for record in records
+                fields_keys == record["fields"].keys() for record in records
             )
-            self._tables[base_id, table_name].extend(records)
-        else:
-            self._tables[base_id, table_name] = records
+        table.update((record["id"], record) for record in records)
+
+    def save(self) -> None:
+        self._saved_tables = deepcopy(self._tables)
+
+    def reset(self) -> None:
+        if self._dirty:
+            self._tables = deepcopy(self._saved_tables)
+            self._dirty = False
+        self._requests.clear()
 
     async def start(self) -> None:
         if self._started:
             raise RuntimeError("Server already started")
-        self._tmp_dir = await self._loop.run_in_executor(None, mkdtemp)
+        self._tmp_dir = mkdtemp()
         await self._runner.setup()
         await UnixSite(self._runner, self._socket_path).start()
         self._started = True
@@ -218,10 +293,14 @@ class AirtableServer:
             raise RuntimeError("Server not started")
         assert self._tmp_dir is not None
         await self._runner.cleanup()
-        await self._loop.run_in_executor(None, os.remove, self._socket_path)
-        await self._loop.run_in_executor(None, os.rmdir, self._tmp_dir)
+        await self._loop.run_in_executor(None, self._remove_tmp_dir)
         self._started = False
 
+    def _remove_tmp_dir(self) -> None:
+        assert self._tmp_dir is not None
+        os.remove(self._socket_path)
+        os.rmdir(self._tmp_dir)
+
     @property
     def _socket_path(self) -> str:
         return f"{self._tmp_dir}/site.socket"
@@ -238,13 +317,13 @@ class AirtableServer:
         if (base_id, table_name) not in self._tables:
             raise HTTPNotFound(reason="Table not found")
         sort: dict[int, dict[str, str]] = {}
+        counts = Counter(request.query.keys())
         for key in request.query:
-            if (
-                not key.startswith("fields")
-                and len(request.query.getall(key)) > 1
-            ):
+            if not key.startswith("fields") and counts[key] > 1:
                 raise HTTPBadRequest(reason="Wrong sort parameter1")
-            match = re.match(r"sort\[([^]]+)]\[([^]]+)]", key)
+            if not key.startswith("sort["):
+                continue
+            match = SORT_KEY_RE.match(key)
             if match is not None:
                 index, fd = match.groups()
                 if not index.isdigit() or fd not in ("field", "direction"):
@@ -255,38 +334,51 @@ class AirtableServer:
                     sort[int(index)] = {fd: request.query[key]}
         if not all("field" in item for item in sort.values()):
             raise HTTPBadRequest(reason="Wrong sort parameter3")
-        records = self._tables[base_id, table_name].copy()
-        for sort_index in sorted(sort, reverse=True):
+        records = list(self._tables[base_id, table_name].values())
+        sort_fields: list[tuple[str, bool]] = []
+        for sort_index in sorted(sort):
             field = sort[sort_index]["field"]
             if field not in records[0]["fields"]:
                 raise HTTPBadRequest(reason="Wrong sort parameter4")
             direction = sort[sort_index].get("direction", "asc")
-            records.sort(
-                key=fields_sort_key(field), reverse=direction == "desc"
-            )
+            sort_fields.append((field, direction == "desc"))
+        if sort_fields:
+            records.sort(key=fields_sort_key(records, sort_fields))
         if "maxRecords" in request.query:
             max_records = int(request.query["maxRecords"])
             records = records[:max_records]
         offset: Optional[str] = None
         if "offset" in request.query:
-            for rec_idx, record in enumerate(records, start=1):
-                if record["id"] == request.query["offset"]:
-                    records = records[rec_idx:]
-                    break
-            else:
+            next_indices = {
+                record["id"]: index
+                for index, record in enumerate(records, start=1)
+            }
+            rec_idx = next_indices.get(request.query["offset"])
+            if rec_idx is None:
                 raise HTTPBadRequest(reason="Wrong sort parameter5")
+            records = records[rec_idx:]
         page_size = int(request.query.get("pageSize", "100"))
         if len(records) > page_size:
             records = records[:page_size]
             offset = records[-1]["id"]
         if "fields[]" in request.query:
-            fields = request.query.getall("fields[]")
-            for record in records:
-                record["fields"] = {
-                    key: value
-                    for key, value in record["fields"].items()
-                    if key in fields
-                }
+            fields = frozenset(request.query.getall("fields[]"))
+            records = [
+                (
+                    record
+                    if fields.issuperset(record["fields"])
+                    else Record(
+                        id=record["id"],
+                        fields={
+                            key: value
+                            for key, value in record["fields"].items()
+                            if key in fields
+                        },
+                        createdTime=record["createdTime"],
+                    )
+                )
+                for record in records
+            ]
         if offset is not None:
             response = {"records": records, "offset": offset}
         else:
@@ -299,27 +391,30 @@ class AirtableServer:
         record_id = request.match_info["record_id"]
         if (base_id, table_name) not in self._tables:
             raise HTTPNotFound(reason="Table not found")
-        for record in self._tables[base_id, table_name]:
-            if record["id"] == record_id:
-                return json_response(record)
-        else:
+        record = self._tables[base_id, table_name].get(record_id)
+        if record is None:
             raise HTTPNotFound()
+        return json_response(record)
 
     async def create_record(self, request: Request) -> Response:
         base_id = request.match_info["base_id"]
         table_name = request.match_info["table_name"]
-        fields = (await request.json())["fields"]
+        data = request[REQUEST_DATA]
         created_time = datetime.now().strftime(DT_FORMAT)
-        record = Record(
-            id=f"record{self._loop.time()}",
-            fields=fields,
-            createdTime=created_time,
-        )
-        if (base_id, table_name) in self._tables:
-            self._tables[base_id, table_name].append(record)
-        else:
-            self._tables[base_id, table_name] = [record]
-        return json_response(record)
+        self._dirty = True
+        records = [
+            Record(
+                id=f"record_new_{next(self._new_ids):03d}",
+                fields=item["fields"],
+                createdTime=created_time,
+            )
+            for item in data.get("records", (data,))
+        ]
+        table = self._tables.setdefault((base_id, table_name), {})
+        table.update((record["id"], record) for record in records)
+        if "records" in data:
+            return json_response({"records": records})
+        return json_response(records[0])
 
     async def update_record(self, request: Request) -> Response:
         base_id = request.match_info["base_id"]
@@ -327,12 +422,12 @@ class AirtableServer:
         record_id = request.match_info["record_id"]
         if (base_id, table_name) not in self._tables:
             raise HTTPNotFound(reason="Table not found")
-        for record in self._tables[base_id, table_name]:
-            if record["id"] == record_id:
-                record["fields"] = (await request.json())["fields"]
-                return json_response(record)
-        else:
+        record = self._tables[base_id, table_name].get(record_id)
+        if record is None:
             raise HTTPNotFound()
+        self._dirty = True
+        record["fields"] = request[REQUEST_DATA]["fields"]
+        return json_response(record)
 
     async def delete_record(self, request: Request) -> Response:
         base_id = request.match_info["base_id"]
@@ -340,105 +435,175 @@ class AirtableServer:
         record_id = request.match_info["record_id"]
         if (base_id, table_name) not in self._tables:
             raise HTTPNotFound(reason="Table not found")
-        table = self._tables[base_id, table_name]
-        for index, record in enumerate(table.copy()):
-            if record["id"] == record_id:
-                table.pop(index)
-                deleted_record = DeletedRecord(id=record_id, deleted=True)
-                return json_response(deleted_record)
-        else:
+        if self._tables[base_id, table_name].pop(record_id, None) is None:
             raise HTTPNotFound()
+        self._dirty = True
+        deleted_record = DeletedRecord(id=record_id, deleted=True)
+        return json_response(deleted_record)
 
 
-@pytest_asyncio.fixture
+@pytest.fixture
 def url() -> URL:
     url = URL("https://api.airtable.com/v0/base_id/table_name")
     return url.with_query(maxRecords=0)
 
 
-@pytest_asyncio.fixture
+@pytest.fixture(scope="session")
 def dt_str() -> str:
-    return datetime.now().strftime(DT_FORMAT)
+    return DT_STR
+
+
+@pytest.fixture(scope="session")
+def parsed_dt() -> datetime:
+    return parse_dt(DT_STR)
 
 
-@pytest_asyncio.fixture
-async def server(dt_str: str) -> AsyncGenerator[AirtableServer, None]:
+@pytest_asyncio.fixture(scope="session")
+async def _server() -> AsyncGenerator[AirtableServer, None]:
     server = AirtableServer("some_key")
-    records = [
-        Record(
-            id=f"record{index:03d}",
-            fields={
-                "field_1": f"value_1_{index:03d}",
-                "field_2": f"value_2_{index:03d}",
-                "field_3": f"value_3_{index:03d}",
-            },
-            createdTime=dt_str,
-        )
-        for index in range(200)
-    ]
-    server.add_records("base_id", "table_name", records)
+    server.add_records(
+        "base_id", "table_name", deepcopy(list(BASELINE_RECORDS))
+    )
+    server.save()
     await server.start()
     yield server
     await server.stop()
 
 
-@pytest_asyncio.fixture
-async def airtable(server: AirtableServer) -> AsyncGenerator[Airtable, None]:
-    airtable = Airtable("some_key", server.connector)
+@pytest.fixture
+def server(_server: AirtableServer) -> AirtableServer:
+    _server.reset()
+    return _server
+
+
+@pytest_asyncio.fixture(scope="session")
+async def _airtable(
+    _server: AirtableServer,
+) -> AsyncGenerator[Airtable, None]:
+    airtable = Airtable("some_key", _server.connector)
     yield airtable
     await airtable.close()
 
 
-def test_backoff_wait_gen() -> None:
-    wait_gen = aat.backoff_wait_gen(aat.AT_WAIT)
-    wait_gen.send(None)
-    for value, i in zip(wait_gen, range(16)):
-        assert value == aat.AT_WAIT + 2**i
+@pytest.fixture
+def airtable(_airtable: Airtable) -> Airtable:
+    _airtable._windows.clear()
+    return _airtable
 
 
-@pytest.mark.asyncio
-async def test_backoff() -> None:
-    class TestClient:
+def client_response_error(status: int) -> ClientResponseError:
+    url = URL("example.com")
+    info = RequestInfo(url, "GET", CIMultiDictProxy(CIMultiDict()), url)
+    return ClientResponseError(info, tuple(), status=status)
 
-        def __init__(self) -> None:
-            self.first_attempt = True
 
-        @backoff.on_exception(
-            aat.backoff_wait_gen,
-            ClientResponseError,
-            giveup=aat.backoff_giveup,
-            at_wait=0.01,
-        )
-        async def request(self) -> None:
-            if self.first_attempt:
-                self.first_attempt = False
-                raise client_response_error(429)
-            else:
-                raise client_response_error(430)
-
-    tc = TestClient()
+@given(integers(min_value=100, max_value=526))
+def test_retry_codes(status: int) -> None:
+    retry_flag = status in (429, 502, 503, 504)
+    assert (status in aat._RETRY_CODES) == retry_flag
+
+
+async def test_retry(url: URL, mocker: MockerFixture) -> None:
+    airtable = Airtable("some_key")
+    request = mocker.patch.object(Airtable, "_request")
+    request.side_effect = (
+        client_response_error(429),
+        client_response_error(503),
+        aat.RecordList(records=()),
+    )
+    sleep = mocker.patch("asyncio.sleep")
+    uniform = mocker.patch("random.uniform", return_value=0.5)
+    assert await airtable.request(
+        "base_id", "GET", url, aat.RecordList
+    ) == aat.RecordList(records=())
+    assert request.await_count == 3
+    assert uniform.call_args_list == [
+        call(0, 2**attempt) for attempt in range(2)
+    ]
+    assert sleep.await_args_list == [call(aat.AT_WAIT + 0.5)] * 2
+    await airtable.close()
+
+
+async def test_retry_giveup(url: URL, mocker: MockerFixture) -> None:
+    airtable = Airtable("some_key")
+    request = mocker.patch.object(Airtable, "_request")
+    request.side_effect = client_response_error(430)
+    sleep = mocker.patch("asyncio.sleep")
     with pytest.raises(ClientResponseError) as exc_info:
-        await tc.request()
-    assert exc_info.type is ClientResponseError
+        await airtable.request("base_id", "GET", url, aat.RecordList)
     assert exc_info.value.status == 430
-    assert not tc.first_attempt
+    assert request.await_count == 1
+    sleep.assert_not_awaited()
+    await airtable.close()
 
 
-def client_response_error(status: int) -> ClientResponseError:
-    url = URL("example.com")
-    info = RequestInfo(url, "GET", CIMultiDictProxy(CIMultiDict()), url)
-    return ClientResponseError(info, tuple(), status=status)
+async def test_retry_exhausted(url: URL, mocker: MockerFixture) -> None:
+    airtable = Airtable("some_key")
+    request = mocker.patch.object(Airtable, "_request")
+    request.side_effect = client_response_error(429)
+    mocker.patch.object(aat.SlidingWindow, "acquire")
+    sleep = mocker.patch("asyncio.sleep")
+    uniform = mocker.patch("random.uniform", return_value=0.5)
+    with pytest.raises(ClientResponseError) as exc_info:
+        await airtable.request("base_id", "GET", url, aat.RecordList)
+    assert exc_info.value.status == 429
+    assert request.await_count == aat.AT_MAX_RETRIES + 1
+    assert uniform.call_args_list == [
+        call(0, 2**attempt) for attempt in range(aat.AT_MAX_RETRIES)
+    ]
+    assert (
+        sleep.await_args_list == [call(aat.AT_WAIT + 0.5)] * aat.AT_MAX_RETRIES
+    )
+    await airtable.close()
 
 
-@given(integers(min_value=100, max_value=526))
-def test_backoff_giveup(status: int) -> None:
-    backoff_flag = status not in (429, 502, 503, 504)
-    assert aat.backoff_giveup(client_response_error(status)) == backoff_flag
+async def test_sliding_window() -> None:
+    loop = asyncio.get_running_loop()
+    window = aat.SlidingWindow(3, 0.05)
+    time1 = loop.time()
+    for _ in range(3):
+        await window.acquire()
+    time2 = loop.time()
+    await window.acquire()
+    time3 = loop.time()
+    assert time2 - time1 < 0.05
+    assert time3 - time1 >= 0.05 - CLOCK_RESOLUTION
 
 
-def test_backoff_giveup_wrong_exception() -> None:
-    with pytest.raises(AssertionError):
-        aat.backoff_giveup(ValueError())
+async def test_airtable_request_window(
+    url: URL,
+    mocker: MockerFixture,
+) -> None:
+    airtable = Airtable("some_key")
+    mocker.patch.object(
+        Airtable, "_request", return_value=aat.RecordList(records=())
+    )
+    sleep = mocker.patch("asyncio.sleep")
+    mocker.patch.object(asyncio.get_running_loop(), "time", return_value=0.0)
+    await asyncio.gather(
+        *(
+            airtable.request("base_id", "GET", url, aat.RecordList)
+            for _ in range(aat.AT_BURST * 2)
+        )
+    )
+    delays = [args[0] for args, _ in sleep.await_args_list]
+    times = sorted([0.0] * (aat.AT_BURST * 2 - len(delays)) + delays)
+    assert all(
+        later - earlier >= 1
+        for earlier, later in zip(times, islice(times, aat.AT_BURST, None))
+    )
+    await airtable.close()
+
+
+def test_get_decoder() -> None:
+    decoder = aat.get_decoder(aat.RecordList[F])
+    assert decoder is aat.get_decoder(aat.RecordList[F])
+    assert decoder.decode(b'{"records": []}') == aat.RecordList(records=())
+
+
+def test_sort_keys() -> None:
+    assert aat.sort_keys(20) == ("sort[20][field]", "sort[20][direction]")
+    assert aat._SORT_KEYS[3] == ("sort[3][field]", "sort[3][direction]")
 
 
 def test_build_repr() -> None:
@@ -446,12 +611,10 @@ def test_build_repr() -> None:
     assert repr_str == "A(b=1, c=2.34, d='efg')"
 
 
-@pytest.mark.asyncio
 async def test_airtable_repr(airtable: Airtable) -> None:
     assert repr(airtable) == "Airtable(api_key='...')"
 
 
-@pytest.mark.asyncio
 async def test_airtable_client(
     server: AirtableServer, airtable: Airtable, url: URL
 ) -> None:
@@ -463,7 +626,6 @@ async def test_airtable_client(
     assert server.requests() == []
 
 
-@pytest.mark.asyncio
 async def test_airtable_underscore_request(
     server: AirtableServer,
     airtable: Airtable,
@@ -475,57 +637,72 @@ async def test_airtable_underscore_request(
     assert server.requests() == [RequestData("GET", url, None)]
 
 
-@pytest.mark.asyncio
 async def test_airtable_request(
     server: AirtableServer,
     airtable: Airtable,
     url: URL,
+    mocker: MockerFixture,
 ) -> None:
     loop = asyncio.get_running_loop()
-    time1 = loop.time()
-    assert await airtable.request(
-        "base_id",
-        "GET",
-        url,
-        aat.RecordList,
-    ) == aat.RecordList(records=())
-    assert server.requests() == [RequestData("GET", url, None)]
-    assert await airtable.request(
-        "base_id",
-        "GET",
-        url,
-        aat.RecordList,
-    ) == aat.RecordList(records=())
-    time2 = loop.time()
-    assert time2 - time1 >= aat.AT_INTERVAL
-    assert server.requests() == [
-        RequestData("GET", url, None),
-        RequestData("GET", url, None),
-    ]
+    sleep = mocker.patch("asyncio.sleep")
+    mocker.patch.object(loop, "time", return_value=loop.time())
+    for _ in range(aat.AT_BURST + 1):
+        assert await airtable.request(
+            "base_id",
+            "GET",
+            url,
+            aat.RecordList,
+        ) == aat.RecordList(records=())
+    sleep.assert_awaited_once_with(aat.AT_BURST * aat.AT_INTERVAL)
+    assert server.requests() == [RequestData("GET", url, None)] * (
+        aat.AT_BURST + 1
+    )
 
 
-@pytest.mark.asyncio
 async def test_airtable_close() -> None:
     airtable = Airtable("secret_key")
     await airtable.close()
     assert airtable._client.closed
 
 
-@pytest.mark.asyncio
-async def test_airtable_context(airtable: Airtable) -> None:
+async def test_airtable_default_connector() -> None:
+    airtable = Airtable("secret_key")
+    connector = airtable.client.connector
+    assert isinstance(connector, TCPConnector)
+    assert connector.limit_per_host == aat.AT_LIMIT_PER_HOST
+    await airtable.close()
+    assert connector.closed
+
+
+async def test_airtable_session() -> None:
+    async with ClientSession() as session:
+        airtable = Airtable("secret_key", session=session)
+        assert airtable.client is session
+        await airtable.close()
+        assert not session.closed
+
+
+async def test_airtable_session_and_connector() -> None:
+    async with ClientSession() as session:
+        connector = session.connector
+        assert connector is not None
+        with pytest.raises(ValueError, match="either session or connector"):
+            Airtable("secret_key", connector, session=session)
+
+
+async def test_airtable_context() -> None:
+    airtable = Airtable("secret_key")
     async with airtable:
         pass
     assert airtable._client.closed
 
 
-@pytest.mark.asyncio
 async def test_airtable_base(airtable: Airtable) -> None:
     base = airtable.base("some_base_id")
     assert isinstance(base, AirtableBase)
     assert base.id == "some_base_id"
 
 
-@pytest.mark.asyncio
 async def test_airtable_base_repr(airtable: Airtable) -> None:
     base = airtable.base("some_base_id")
     assert repr(base) == (
@@ -534,19 +711,16 @@ async def test_airtable_base_repr(airtable: Airtable) -> None:
     )
 
 
-@pytest.mark.asyncio
 async def test_airtable_base_id(airtable: Airtable) -> None:
     base = airtable.base("some_base_id")
     assert base.id == "some_base_id"
 
 
-@pytest.mark.asyncio
 async def test_airtable_base_url(airtable: Airtable) -> None:
     base = airtable.base("some_base_id")
     assert base.url == aat.API_URL / "some_base_id"
 
 
-@pytest.mark.asyncio
 async def test_airtable_base_request(
     server: AirtableServer, airtable: Airtable, url: URL
 ) -> None:
@@ -561,7 +735,6 @@ class S(Struct):
     pass
 
 
-@pytest.mark.asyncio
 async def test_airtable_base_table(airtable: Airtable) -> None:
     base = airtable.base("some_base_id")
     table = base.table("some_table", Fields)
@@ -571,7 +744,6 @@ async def test_airtable_base_table(airtable: Airtable) -> None:
     assert table.base == base
 
 
-@pytest.mark.asyncio
 async def test_airtable_table_request(
     server: AirtableServer,
     airtable: Airtable,
@@ -591,11 +763,10 @@ class F(Fields):
     field_3: str | None = None
 
 
-@pytest.mark.asyncio
 async def test_airtable_table_list_records(
     server: AirtableServer,
     airtable: Airtable,
-    dt_str: str,
+    parsed_dt: datetime,
 ) -> None:
     base = airtable.base("base_id")
     table = base.table("table_name", F)
@@ -614,24 +785,7 @@ async def test_airtable_table_list_records(
     assert server.requests() == [
         RequestData(
             "GET",
-            table.url.with_query(
-                (
-                    ("fields[]", "field_1"),
-                    ("fields[]", "field_2"),
-                    ("filterByFormula", "{field_3}"),
-                    ("maxRecords", "100500"),
-                    ("pageSize", "3"),
-                    ("sort[0][field]", "field_1"),
-                    ("sort[0][direction]", "asc"),
-                    ("sort[1][field]", "field_2"),
-                    ("sort[1][direction]", "desc"),
-                    ("view", "table3"),
-                    ("cellFormat", "json"),
-                    ("timeZone", "Europe/Moscow"),
-                    ("userLocale", "ru"),
-                    ("offset", "record033"),
-                )
-            ),
+            LIST_RECORDS_URL,
             None,
         )
     ]
@@ -642,16 +796,31 @@ async def test_airtable_table_list_records(
         assert record.fields.field_1 == f"value_1_{index:03d}"
         assert record.fields.field_2 == f"value_2_{index:03d}"
         assert record.fields.field_3 is None
-        assert record.created_time == parse_dt(dt_str)
+        assert record.created_time == parsed_dt
         assert record.table == table
     assert offset == "record036"
 
 
-@pytest.mark.asyncio
+async def test_airtable_table_list_records_fields(
+    server: AirtableServer,
+    airtable: Airtable,
+) -> None:
+    base = airtable.base("base_id")
+    table = base.table("table_name", F)
+    records, _ = await table.list_records(fields=("field_1",), page_size=1)
+    assert records[0].fields == F(field_1="value_1_000")
+    record = await table.retrieve_record("record000")
+    assert record.fields == F(
+        field_1="value_1_000",
+        field_2="value_2_000",
+        field_3="value_3_000",
+    )
+
+
 async def test_airtable_table_iter_records(
     server: AirtableServer,
     airtable: Airtable,
-    dt_str: str,
+    parsed_dt: datetime,
 ) -> None:
     base = airtable.base("base_id")
     table = base.table("table_name", F)
@@ -670,40 +839,20 @@ async def test_airtable_table_iter_records(
         assert record.fields.field_1 == f"value_1_{index:03d}"
         assert record.fields.field_2 is None
         assert record.fields.field_3 is None
-        assert record.created_time == parse_dt(dt_str)
+        assert record.created_time == parsed_dt
         assert record.table == table
     assert server.requests() == [
+        RequestData("GET", ITER_RECORDS_URL, None),
         RequestData(
-            "GET",
-            table.url.with_query(
-                (
-                    ("fields[]", "field_1"),
-                    ("maxRecords", "6"),
-                    ("pageSize", "3"),
-                )
-            ),
-            None,
-        ),
-        RequestData(
-            "GET",
-            table.url.with_query(
-                (
-                    ("fields[]", "field_1"),
-                    ("maxRecords", "6"),
-                    ("pageSize", "3"),
-                    ("offset", "record002"),
-                )
-            ),
-            None,
+            "GET", ITER_RECORDS_URL.update_query(offset="record002"), None
         ),
     ]
 
 
-@pytest.mark.asyncio
 async def test_airtable_table_retrieve_record(
     server: AirtableServer,
     airtable: Airtable,
-    dt_str: str,
+    parsed_dt: datetime,
 ) -> None:
     base = airtable.base("base_id")
     table = base.table("table_name", F)
@@ -715,7 +864,7 @@ async def test_airtable_table_retrieve_record(
         field_2="value_2_003",
         field_3="value_3_003",
     )
-    assert record.created_time == parse_dt(dt_str)
+    assert record.created_time == parsed_dt
     assert record.table == table
     assert server.requests() == [
         RequestData(
@@ -726,7 +875,6 @@ async def test_airtable_table_retrieve_record(
     ]
 
 
-@pytest.mark.asyncio
 async def test_airtable_table_create_record(
     server: AirtableServer,
     airtable: Airtable,
@@ -764,7 +912,37 @@ async def test_airtable_table_create_record(
     ]
 
 
-@pytest.mark.asyncio
+async def test_airtable_table_create_records(
+    server: AirtableServer,
+    airtable: Airtable,
+) -> None:
+    base = airtable.base("base_id")
+    table = base.table("table_name", F)
+    fields = [
+        F(field_1=f"value_1_new_{index:03d}", field_2="", field_3="")
+        for index in range(12)
+    ]
+    records = await table.create_records(fields)
+    assert len(records) == 12
+    for record, record_fields in zip(records, fields):
+        assert isinstance(record, AirtableRecord)
+        assert record.fields == record_fields
+        assert record.table == table
+    requests = server.requests()
+    assert len(requests) == 2
+    assert all(
+        request.method == "POST" and request.url == table.url
+        for request in requests
+    )
+    assert [
+        [record["fields"]["field_1"] for record in request.data["records"]]
+        for request in requests
+    ] == [
+        [f"value_1_new_{index:03d}" for index in range(10)],
+        ["value_1_new_010", "value_1_new_011"],
+    ]
+
+
 async def test_airtable_record_init(
     airtable: Airtable,
     dt_str: str,
@@ -780,7 +958,6 @@ async def test_airtable_record_init(
     assert isinstance(record, AirtableRecord)
 
 
-@pytest.mark.asyncio
 async def test_airtable_record_repr(airtable: Airtable) -> None:
     base = airtable.base("some_base_id")
     table = base.table("some_table", Fields)
@@ -801,7 +978,6 @@ async def test_airtable_record_repr(airtable: Airtable) -> None:
     )
 
 
-@pytest.mark.asyncio
 async def test_airtable_record_table(airtable: Airtable) -> None:
     base = airtable.base("some_base_id")
     table = base.table("some_table", Fields)
@@ -814,12 +990,24 @@ async def test_airtable_record_table(airtable: Airtable) -> None:
     assert record.table == table
 
 
-@pytest.mark.asyncio
+async def test_airtable_record_url(airtable: Airtable) -> None:
+    base = airtable.base("some_base_id")
+    table = base.table("some_table", Fields)
+    record = AirtableRecord(
+        "record1",
+        Fields(),
+        datetime.now(UTC),
+        table,
+    )
+    assert record.url == table.url / "record1"
+    assert record.url is record.url
+
+
 async def test_airtable_record_request(
     server: AirtableServer,
     airtable: Airtable,
     url: URL,
-    dt_str: str,
+    parsed_dt: datetime,
 ) -> None:
     base = airtable.base("base_id")
     table = base.table("table_name", F)
@@ -831,7 +1019,7 @@ async def test_airtable_record_request(
     record = AirtableRecord(
         "record000",
         f,
-        parse_dt(dt_str),
+        parsed_dt,
         table,
     )
     assert await record._request(
@@ -841,16 +1029,15 @@ async def test_airtable_record_request(
     ) == aat.Record(
         id="record000",
         fields=f,
-        created_time=parse_dt(dt_str),
+        created_time=parsed_dt,
     )
     assert server.requests() == [RequestData("GET", record.url, None)]
 
 
-@pytest.mark.asyncio
 async def test_airtable_record_update(
     server: AirtableServer,
     airtable: Airtable,
-    dt_str: str,
+    parsed_dt: datetime,
 ) -> None:
     base = airtable.base("base_id")
     table = base.table("table_name", F)
@@ -862,7 +1049,7 @@ async def test_airtable_record_update(
     record = AirtableRecord(
         "record000",
         f1,
-        parse_dt(dt_str),
+        parsed_dt,
         table,
     )
     f2 = F(
@@ -887,7 +1074,6 @@ async def test_airtable_record_update(
     ]
 
 
-@pytest.mark.asyncio
 async def test_airtable_record_delete(
     server: AirtableServer,
     airtable: Airtable,
@@ -1,6 +1,6 @@
 import asyncio
 from datetime import UTC, datetime
-from typing import AsyncGenerator, Final
+from typing import Any, AsyncGenerator, Awaitable, Callable, Final, cast
 from unittest.mock import call
 
 import msgspec.json
@@ -14,23 +14,69 @@ from yarl import URL
 from aioairtable import Airtable
 from aioairtable import aioairtable as aat
 from aioairtable.aioairtable import (
+    AirtableBase,
     AirtableRecord,
+    AirtableTable,
     CellFormat,
     Fields,
     RecordRequest,
     SortDirection,
 )
 
-DT_FORMAT: Final = "%Y-%m-%dT%H:%M:%S.000Z"
-
-
-def parse_dt(string: str) -> datetime:
-    return datetime.strptime(string, DT_FORMAT).replace(tzinfo=UTC)
-
-
-@pytest.fixture
-def dt_str() -> str:
-    return datetime.now().strftime(DT_FORMAT)
+NOW: Final = datetime(2024, 1, 1, tzinfo=UTC)
+HEADERS: Final = CIMultiDict(
+    (
+        ("User-Agent", aat.SOFTWARE),
+        ("Authorization", "Bearer secret_key"),
+    )
+)
+JSON_HEADERS: Final = CIMultiDict(
+    (*HEADERS.items(), ("Content-Type", "application/json"))
+)
+TABLE_URL: Final = aat.API_URL / "some_base_id" / "some_table"
+LIST_RECORDS_URL: Final = TABLE_URL.with_query(
+    (
+        ("fields[]", "field1"),
+        ("fields[]", "field2"),
+        ("fields[]", "field3"),
+        ("filterByFormula", "{field4}"),
+        ("maxRecords", "100500"),
+        ("pageSize", "10"),
+        ("sort[0][field]", "field5"),
+        ("sort[0][direction]", "asc"),
+        ("sort[1][field]", "field6"),
+        ("sort[1][direction]", "desc"),
+        ("view", "table3"),
+        ("cellFormat", "json"),
+        ("timeZone", "Europe/Moscow"),
+        ("userLocale", "ru"),
+        ("offset", "offset22"),
+    )
+)
+ITER_RECORDS_URL: Final = TABLE_URL.with_query(pageSize=25)
+PAGE1: Final = aat.RecordList(
+    records=(
+        aat.Record(id="record1", fields=Fields(), created_time=NOW),
+        aat.Record(id="record2", fields=Fields(), created_time=NOW),
+        aat.Record(id="record3", fields=Fields(), created_time=NOW),
+    ),
+    offset="offset1",
+)
+PAGE2: Final = aat.RecordList(
+    records=(
+        aat.Record(id="record4", fields=Fields(), created_time=NOW),
+        aat.Record(id="record5", fields=Fields(), created_time=NOW),
+        aat.Record(id="record6", fields=Fields(), created_time=NOW),
+    ),
+)
+ITER_RECORDS_CALLS: Final = [
+    call("GET", ITER_RECORDS_URL, type_=aat.RecordList[Fields]),
+    call(
+        "GET",
+        ITER_RECORDS_URL.update_query(offset="offset1"),
+        type_=aat.RecordList[Fields],
+    ),
+]
 
 
 @pytest.fixture
@@ -38,169 +84,169 @@ def url() -> URL:
     return URL("https://example.com")
 
 
-@pytest_asyncio.fixture
+@pytest_asyncio.fixture(scope="session")
 async def _airtable() -> AsyncGenerator[Airtable, None]:
     airtable = Airtable("secret_key")
     yield airtable
     await airtable.close()
 
 
+@pytest.fixture(scope="module")
+def base(_airtable: Airtable) -> AirtableBase:
+    return _airtable.base("some_base_id")
+
+
+@pytest.fixture(scope="module")
+def table(base: AirtableBase) -> AirtableTable[Fields]:
+    return base.table("some_table", Fields)
+
+
 class SomeResponseData(Struct, frozen=True):
     some_key: int
 
 
-@pytest.fixture
-def some_response_data() -> SomeResponseData:
-    return SomeResponseData(55)
+SOME_RESPONSE_DATA: Final = SomeResponseData(55)
+SOME_RESPONSE_BYTES: Final = msgspec.json.encode(SOME_RESPONSE_DATA)
 
 
-@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "payload, headers, data",
+    (
+        (None, HEADERS, None),
+        (Struct(), JSON_HEADERS, b"{}"),
+    ),
+)
 async def test_airtable_underscore_request(
     _airtable: Airtable,
     url: URL,
-    some_response_data: SomeResponseData,
     mocker: MockerFixture,
+    payload: Struct | None,
+    headers: CIMultiDict[str],
+    data: bytes | None,
 ) -> None:
     request = mocker.patch.object(_airtable._client, "request")
     response = request.return_value.__aenter__.return_value
-    response.read.return_value = msgspec.json.encode(some_response_data)
+    response.read.return_value = SOME_RESPONSE_BYTES
     assert (
         await _airtable._request(
             "GET",
             url,
             SomeResponseData,
+            payload,
         )
-        == some_response_data
+        == SOME_RESPONSE_DATA
     )
     request.assert_called_once_with(
         "GET",
         url,
-        headers=CIMultiDict(
-            (
-                ("User-Agent", aat.SOFTWARE),
-                ("Authorization", "Bearer secret_key"),
-            )
-        ),
-        data=None,
+        headers=headers,
+        data=data,
+        raise_for_status=True,
     )
     response.read.assert_awaited_once_with()
 
 
-@pytest.mark.asyncio
-async def test_airtable_underscore_request_payload(
-    _airtable: Airtable,
+async def test_airtable_underscore_request_etag(
     url: URL,
-    some_response_data: SomeResponseData,
     mocker: MockerFixture,
 ) -> None:
-    request = mocker.patch.object(_airtable._client, "request")
+    airtable = Airtable("secret_key", etag_cache_size=1)
+    request = mocker.patch.object(airtable._client, "request")
     response = request.return_value.__aenter__.return_value
-    response.read.return_value = msgspec.json.encode(some_response_data)
+    response.status = 200
+    response.headers = CIMultiDict({"ETag": '"etag1"'})
+    response.read.return_value = SOME_RESPONSE_BYTES
     assert (
-        await _airtable._request(
-            "GET",
-            url,
-            SomeResponseData,
-            Struct(),
-        )
-        == some_response_data
+        await airtable._request("GET", url, SomeResponseData)
+        == SOME_RESPONSE_DATA
     )
-    request.assert_called_once_with(
-        "GET",
-        url,
-        headers=CIMultiDict(
-            (
-                ("User-Agent", aat.SOFTWARE),
-                ("Authorization", "Bearer secret_key"),
-                ("Content-Type", "application/json"),
-            )
-        ),
-        data=b"{}",
+    assert "If-None-Match" not in request.call_args.kwargs["headers"]
+    response.status = 304
+    assert (
+        await airtable._request("GET", url, SomeResponseData)
+        == SOME_RESPONSE_DATA
     )
+    assert request.call_args.kwargs["headers"]["If-None-Match"] == '"etag1"'
     response.read.assert_awaited_once_with()
+    response.status = 200
+    other_url = url / "other"
+    await airtable._request("GET", other_url, SomeResponseData)
+    assert list(airtable._etag_cache) == [(other_url, SomeResponseData)]
+    await airtable.close()
 
 
-@pytest.mark.asyncio
 async def test_airtable_request(
     _airtable: Airtable,
     url: URL,
-    some_response_data: SomeResponseData,
     mocker: MockerFixture,
 ) -> None:
-    loop = asyncio.get_running_loop()
-    request = mocker.patch.object(_airtable, "_request")
-    request.return_value = some_response_data
-    assert (
-        await _airtable.request(
-            "some_base_id",
-            "GET",
-            url,
-            SomeResponseData,
-        )
-        == some_response_data
+    request = mocker.patch.object(
+        Airtable, "_request", return_value=SOME_RESPONSE_DATA
     )
-    request.assert_awaited_once_with("GET", url, SomeResponseData, None)
-    time1 = loop.time()
-    assert (
-        await _airtable.request(
-            "some_base_id",
-            "GET",
-            url,
-            SomeResponseData,
+    sleep = mocker.patch("asyncio.sleep")
+    mocker.patch.object(asyncio.get_running_loop(), "time", return_value=0.0)
+    _airtable._windows.clear()
+    for _ in range(aat.AT_BURST + 1):
+        assert (
+            await _airtable.request(
+                "some_base_id",
+                "GET",
+                url,
+                SomeResponseData,
+            )
+            == SOME_RESPONSE_DATA
         )
-        == some_response_data
-    )
-    time2 = loop.time()
-    assert time2 - time1 >= aat.AT_INTERVAL
-
-
-@pytest.mark.asyncio
-async def test_airtable_base_request(
-    _airtable: Airtable,
+    sleep.assert_awaited_once_with(aat.AT_BURST * aat.AT_INTERVAL)
+    assert request.await_args_list == [
+        call("GET", url, SomeResponseData, None)
+    ] * (aat.AT_BURST + 1)
+
+
+@pytest.mark.parametrize(
+    "get_request, target, args",
+    (
+        pytest.param(
+            lambda base, table: base.request,
+            Airtable,
+            ("some_base_id",),
+            id="base",
+        ),
+        pytest.param(
+            lambda base, table: table._request,
+            AirtableBase,
+            (),
+            id="table",
+        ),
+        pytest.param(
+            lambda base, table: AirtableRecord(
+                "record1", Fields(), NOW, table
+            )._request,
+            AirtableBase,
+            (),
+            id="record",
+        ),
+    ),
+)
+async def test_airtable_request_delegation(
+    base: AirtableBase,
+    table: AirtableTable[Fields],
     url: URL,
-    some_response_data: SomeResponseData,
     mocker: MockerFixture,
+    get_request: Callable[
+        [AirtableBase, AirtableTable[Fields]], Callable[..., Awaitable[Any]]
+    ],
+    target: type[Airtable | AirtableBase],
+    args: tuple[str, ...],
 ) -> None:
-    base = _airtable.base("some_base_id")
-    request = mocker.patch.object(base._airtable, "request")
-    request.return_value = some_response_data
-    assert (
-        await base.request(
-            "GET",
-            url,
-            SomeResponseData,
-        )
-        == some_response_data
+    request = mocker.patch.object(
+        target, "request", return_value=SOME_RESPONSE_DATA
     )
-    request.assert_awaited_once_with(
-        "some_base_id",
-        "GET",
-        url,
-        SomeResponseData,
-        None,
-    )
-
-
-@pytest.mark.asyncio
-async def test_airtable_table_request(
-    _airtable: Airtable,
-    url: URL,
-    some_response_data: SomeResponseData,
-    mocker: MockerFixture,
-) -> None:
-    base = _airtable.base("some_base_id")
-    table = base.table("some_table", Fields)
-    request = mocker.patch.object(table._base, "request")
-    request.return_value = some_response_data
     assert (
-        await table._request(
-            "GET",
-            url,
-            SomeResponseData,
-        )
-        == some_response_data
+        await get_request(base, table)("GET", url, SomeResponseData)
+        == SOME_RESPONSE_DATA
     )
     request.assert_awaited_once_with(
+        *args,
         "GET",
         url,
         SomeResponseData,
@@ -208,15 +254,13 @@ async def test_airtable_table_request(
     )
 
 
-@pytest.mark.asyncio
 async def test_airtable_table_list_records(
-    _airtable: Airtable,
+    table: AirtableTable[Fields],
     mocker: MockerFixture,
 ) -> None:
-    base = _airtable.base("some_base_id")
-    table = base.table("some_table", Fields)
-    request = mocker.patch.object(table, "_request")
-    request.return_value = aat.RecordList(records=())
+    request = mocker.patch.object(
+        AirtableTable, "_request", return_value=aat.RecordList(records=())
+    )
     records, offset = await table.list_records(
         fields=("field1", "field2", "field3"),
         filter_by_formula="{field4}",
@@ -231,99 +275,127 @@ async def test_airtable_table_list_records(
     )
     request.assert_awaited_once_with(
         "GET",
-        table.url.with_query(
-            (
-                ("fields[]", "field1"),
-                ("fields[]", "field2"),
-                ("fields[]", "field3"),
-                ("filterByFormula", "{field4}"),
-                ("maxRecords", "100500"),
-                ("pageSize", "10"),
-                ("sort[0][field]", "field5"),
-                ("sort[0][direction]", "asc"),
-                ("sort[1][field]", "field6"),
-                ("sort[1][direction]", "desc"),
-                ("view", "table3"),
-                ("cellFormat", "json"),
-                ("timeZone", "Europe/Moscow"),
-                ("userLocale", "ru"),
-                ("offset", "offset22"),
-            )
-        ),
+        LIST_RECORDS_URL,
         type_=aat.RecordList[Fields],
     )
     assert records == ()
     assert offset is None
 
 
-@pytest.mark.asyncio
-async def test_airtable_table_iter_records(
-    _airtable: Airtable,
-    dt_str: str,
+async def test_airtable_table_list_records_no_params(
+    table: AirtableTable[Fields],
     mocker: MockerFixture,
 ) -> None:
-    base = _airtable.base("some_base_id")
-    table = base.table("some_table", Fields)
-    request = mocker.patch.object(table, "_request")
-    now = datetime.now(UTC)
-    request.side_effect = (
-        aat.RecordList(
-            records=(
-                aat.Record(id="record1", fields=Fields(), created_time=now),
-                aat.Record(id="record2", fields=Fields(), created_time=now),
-                aat.Record(id="record3", fields=Fields(), created_time=now),
-            ),
-            offset="offset1",
-        ),
-        aat.RecordList(
-            records=(
-                aat.Record(id="record4", fields=Fields(), created_time=now),
-                aat.Record(id="record5", fields=Fields(), created_time=now),
-                aat.Record(id="record6", fields=Fields(), created_time=now),
-            ),
-        ),
+    request = mocker.patch.object(
+        AirtableTable, "_request", return_value=aat.RecordList(records=())
     )
-    records = tuple([record async for record in table.iter_records()])
-    assert request.await_args_list == [
-        call(
-            "GET",
-            table.url.with_query(pageSize=25),
-            type_=aat.RecordList[Fields],
-        ),
-        call(
-            "GET",
-            table.url.with_query(pageSize=25, offset="offset1"),
-            type_=aat.RecordList[Fields],
-        ),
-    ]
+    assert await table.list_records() == ((), None)
+    request.assert_awaited_once_with(
+        "GET", table.url, type_=aat.RecordList[Fields]
+    )
+
+
+class StubRequest:
+    def __init__(self, *responses: Any) -> None:
+        self._responses = iter(responses)
+        self.calls: list[tuple[tuple[Any, ...], dict[str, Any]]] = []
+
+    async def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        self.calls.append((args, kwargs))
+        return next(self._responses)
+
+
+async def test_airtable_table_iter_records(
+    table: AirtableTable[Fields],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    request = StubRequest(PAGE1, PAGE2)
+    monkeypatch.setattr(AirtableTable, "_request", request)
+    records = [record async for record in table.iter_records()]
+    assert request.calls == ITER_RECORDS_CALLS
     assert all(isinstance(record, AirtableRecord) for record in records)
-    record_ids = (
+    record_ids = [
         "record1",
         "record2",
         "record3",
         "record4",
         "record5",
         "record6",
+    ]
+    assert [record.id for record in records] == record_ids
+
+
+async def test_airtable_table_iter_records_aclose(
+    table: AirtableTable[Fields],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    started = asyncio.Event()
+    cancelled = False
+
+    async def request(
+        self: AirtableTable[Fields], method: str, url: URL, **kwargs: Any
+    ) -> aat.RecordList[Fields]:
+        nonlocal cancelled
+        if url == ITER_RECORDS_URL:
+            return PAGE1
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        raise AssertionError("unreachable")
+
+    monkeypatch.setattr(AirtableTable, "_request", request)
+    tasks = asyncio.all_tasks()
+    records = cast(
+        AsyncGenerator[AirtableRecord[Fields], None], table.iter_records()
+    )
+    async for record in records:
+        assert record.id == "record1"
+        break
+    await started.wait()
+    await records.aclose()
+    assert cancelled
+    assert asyncio.all_tasks() == tasks
+
+
+async def test_airtable_table_iter_records_max_records(
+    table: AirtableTable[Fields],
+    mocker: MockerFixture,
+) -> None:
+    request = mocker.patch.object(
+        AirtableTable,
+        "_request",
+        return_value=aat.RecordList(
+            records=(
+                aat.Record(id="record1", fields=Fields(), created_time=NOW),
+                aat.Record(id="record2", fields=Fields(), created_time=NOW),
+            ),
+            offset="offset1",
+        ),
+    )
+    records = [record async for record in table.iter_records(max_records=2)]
+    request.assert_awaited_once_with(
+        "GET",
+        table.url.with_query(maxRecords=2, pageSize=25),
+        type_=aat.RecordList[Fields],
     )
-    assert tuple(record.id for record in records) == record_ids
+    assert [record.id for record in records] == ["record1", "record2"]
 
 
-@pytest.mark.asyncio
 async def test_airtable_table_retrieve_record(
-    _airtable: Airtable,
-    dt_str: str,
+    table: AirtableTable[Fields],
     mocker: MockerFixture,
 ) -> None:
-    base = _airtable.base("some_base_id")
-    table = base.table("some_table", Fields)
-    request = mocker.patch.object(table, "_request")
-    now = datetime.now(UTC)
     record = aat.Record(
         id="record1",
         fields=Fields(),
-        created_time=now,
+        created_time=NOW,
+    )
+    request = mocker.patch.object(
+        AirtableTable, "_request", return_value=record
     )
-    request.return_value = record
     at_record = await table.retrieve_record("record1")
     request.assert_awaited_once_with(
         "GET",
@@ -333,24 +405,22 @@ async def test_airtable_table_retrieve_record(
     assert isinstance(at_record, AirtableRecord)
     assert at_record.id == "record1"
     assert at_record.fields == Fields()
-    assert at_record.created_time == now
+    assert at_record.created_time == NOW
     assert at_record.table == table
 
 
-@pytest.mark.asyncio
 async def test_airtable_table_create_record(
-    _airtable: Airtable,
-    dt_str: str,
+    table: AirtableTable[Fields],
     mocker: MockerFixture,
 ) -> None:
-    base = _airtable.base("some_base_id")
-    table = base.table("some_table", Fields)
-    request = mocker.patch.object(table, "_request")
-    now = datetime.now(UTC)
-    request.return_value = aat.Record(
-        id="record1",
-        fields=Fields(),
-        created_time=now,
+    request = mocker.patch.object(
+        AirtableTable,
+        "_request",
+        return_value=aat.Record(
+            id="record1",
+            fields=Fields(),
+            created_time=NOW,
+        ),
     )
     record = await table.create_record(Fields())
     request.assert_awaited_once_with(
@@ -362,63 +432,77 @@ async def test_airtable_table_create_record(
     assert isinstance(record, AirtableRecord)
     assert record.id == "record1"
     assert record.fields == Fields()
-    assert record.created_time == now
+    assert record.created_time == NOW
     assert record.table == table
 
 
-@pytest.mark.asyncio
-async def test_airtable_record_request(
-    _airtable: Airtable,
-    dt_str: str,
-    url: URL,
-    some_response_data: SomeResponseData,
+async def test_airtable_table_create_records(
+    table: AirtableTable[Fields],
     mocker: MockerFixture,
 ) -> None:
-    base = _airtable.base("some_base_id")
-    table = base.table("some_table", Fields)
-    record = AirtableRecord(
-        "record1",
-        Fields(),
-        datetime.now(UTC),
-        table,
-    )
-    request = mocker.patch.object(record.table._base, "request")
-    request.return_value = some_response_data
-    assert (
-        await table._request(
-            "GET",
-            url,
-            SomeResponseData,
-        )
-        == some_response_data
+    request = mocker.patch.object(
+        AirtableTable,
+        "_request",
+        side_effect=(
+            aat.RecordList(
+                records=tuple(
+                    aat.Record(
+                        id=f"record{index}",
+                        fields=Fields(),
+                        created_time=NOW,
+                    )
+                    for index in range(10)
+                ),
+            ),
+            aat.RecordList(
+                records=(
+                    aat.Record(
+                        id="record10", fields=Fields(), created_time=NOW
+                    ),
+                ),
+            ),
+        ),
     )
-    request.assert_awaited_once_with(
-        "GET",
-        url,
-        SomeResponseData,
-        None,
+    records = await table.create_records([Fields()] * 11)
+    assert request.await_args_list == [
+        call(
+            "POST",
+            table.url,
+            type_=aat.RecordList[Fields],
+            payload=aat.RecordsRequest((RecordRequest(Fields()),) * 10),
+        ),
+        call(
+            "POST",
+            table.url,
+            type_=aat.RecordList[Fields],
+            payload=aat.RecordsRequest((RecordRequest(Fields()),)),
+        ),
+    ]
+    assert all(isinstance(record, AirtableRecord) for record in records)
+    assert tuple(record.id for record in records) == tuple(
+        f"record{index}" for index in range(11)
     )
+    assert await table.create_records(()) == ()
 
 
-@pytest.mark.asyncio
 async def test_airtable_record_update(
-    _airtable: Airtable,
-    dt_str: str,
+    table: AirtableTable[Fields],
     mocker: MockerFixture,
 ) -> None:
-    base = _airtable.base("some_base_id")
-    table = base.table("some_table", Fields)
     record = AirtableRecord(
         "record1",
         Fields(),
-        datetime.now(UTC),
+        NOW,
         table,
     )
-    request = mocker.patch.object(record, "_request")
-    request.return_value = aat.Record(
-        "record1",
-        Fields(),
-        datetime.now(UTC),
+    request = mocker.patch.object(
+        AirtableRecord,
+        "_request",
+        return_value=aat.Record(
+            "record1",
+            Fields(),
+            NOW,
+        ),
     )
     await record.update(
         Fields(),
@@ -432,22 +516,21 @@ async def test_airtable_record_update(
     )
 
 
-@pytest.mark.asyncio
 async def test_airtable_record_delete(
-    _airtable: Airtable,
-    dt_str: str,
+    table: AirtableTable[Fields],
     mocker: MockerFixture,
 ) -> None:
-    base = _airtable.base("some_base_id")
-    table = base.table("some_table", Fields)
     record = AirtableRecord(
         "record1",
         Fields(),
-        datetime.now(UTC),
+        NOW,
         table,
     )
-    request = mocker.patch.object(record, "_request")
-    request.return_value = aat.DeletedRecord("record1", True)
+    request = mocker.patch.object(
+        AirtableRecord,
+        "_request",
+        return_value=aat.DeletedRecord("record1", True),
+    )
     await record.delete()
     assert record.deleted
     request.assert_awaited_once_with(
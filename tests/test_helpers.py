@@ -1,16 +1,23 @@
 import re
 from typing import Final
 
-from aioairtable.helpers import get_python_version, get_software
+from aioairtable.helpers import chunked, get_python_version, get_software
 
-VERSION_RXP_STR: Final[str] = r"\d\.\d{1,2}\.[a-z0-9]+"
+VERSION_RXP: Final = re.compile(r"\d\.\d{1,2}\.[a-z0-9]+")
+SOFTWARE_RXP: Final = re.compile(
+    f"Python/{VERSION_RXP.pattern} aioairtable/{VERSION_RXP.pattern}"
+)
 
 
 def test_get_python_version() -> None:
-    version_match = re.match(VERSION_RXP_STR, get_python_version())
-    assert version_match is not None
+    assert VERSION_RXP.match(get_python_version()) is not None
 
 
 def test_get_software() -> None:
-    software_rxp = f"Python/{VERSION_RXP_STR} aioairtable/{VERSION_RXP_STR}"
-    assert re.match(software_rxp, get_software()) is not None
+    assert SOFTWARE_RXP.match(get_software()) is not None
+
+
+def test_chunked() -> None:
+    chunks = [range(0, 2), range(2, 4), range(4, 5)]
+    assert list(chunked(range(5), 2)) == chunks
+    assert list(chunked((), 2)) == []